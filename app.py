@@ -2,15 +2,59 @@
 Simple FastAPI server for demonstration purposes.
 """
 
-import json
-import urllib.error
-import urllib.parse
-import urllib.request
-from typing import Any, Dict
+import os
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator
 
-from fastapi import FastAPI, HTTPException
+import httpx
+import orjson
+from cachetools import TTLCache
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import JSONResponse
 
-app = FastAPI(title="eval-demo", version="1.0")
+_OPENAI_URL = "https://api.openai.com/v1/chat/completions"
+_OPENAI_MODEL = "gpt-3.5-turbo"
+
+# Chat-completions body split around the prompt, which is the only field that
+# varies between calls, so each request only has to encode the prompt itself.
+_BODY_PREFIX = (
+    b'{"model":"' + _OPENAI_MODEL.encode() + b'","messages":[{"role":"user","content":'
+)
+_BODY_SUFFIX = b'}],"max_tokens":150,"temperature":0.7}'
+
+# Rendered /llm success bodies and their insertion times, keyed by prompt, so
+# repeated prompts within the TTL are answered without another OpenAI
+# round-trip or re-serialization.
+_LLM_CACHE_TTL = 60
+_llm_response_cache = TTLCache(maxsize=1024, ttl=_LLM_CACHE_TTL)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the stdlib encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Share one pooled HTTP client for outbound calls across all requests."""
+    async with httpx.AsyncClient(
+        timeout=30,
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+        http2=True,
+    ) as client:
+        app.state.http = client
+        yield
+
+
+app = FastAPI(
+    title="eval-demo",
+    version="1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 
 @app.get("/")
@@ -26,7 +70,7 @@ def health_check():
 
 
 @app.post("/llm")
-def call_openai_llm(prompt: str = "Hello") -> Dict[str, Any]:
+async def call_openai_llm(prompt: str = "Hello") -> Response:
     """
     Make an LLM call to OpenAI API with the given prompt.
 
@@ -34,57 +78,58 @@ def call_openai_llm(prompt: str = "Hello") -> Dict[str, Any]:
         prompt: The prompt to send to the LLM (default: "Hello")
 
     Returns:
-        Dict containing the LLM response or error information
+        JSON response containing the LLM response or error information
     """
-    try:
-        url = "https://api.openai.com/v1/chat/completions"
+    cached = _llm_response_cache.get(prompt)
+    if cached is not None:
+        cached_body, cached_at = cached
+        age = _llm_response_cache.timer() - cached_at
+        return _llm_json_response(cached_body, max_age=_LLM_CACHE_TTL - age)
 
-        data = {
-            "model": "gpt-3.5-turbo",
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 150,
-            "temperature": 0.7,
+    try:
+        body = _BODY_PREFIX + orjson.dumps(prompt) + _BODY_SUFFIX
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {_get_openai_api_key()}",
         }
 
-        json_data = json.dumps(data).encode("utf-8")
-
-        req = urllib.request.Request(
-            url,
-            data=json_data,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {_get_openai_api_key()}",
-            },
-            method="POST",
-        )
-
-        with urllib.request.urlopen(req, timeout=30) as response:
-            response_data = json.loads(response.read().decode("utf-8"))
+        response = await app.state.http.post(_OPENAI_URL, content=body, headers=headers)
+        response.raise_for_status()
+        response_data = orjson.loads(response.content)
 
         if "choices" in response_data and len(response_data["choices"]) > 0:
             content = response_data["choices"][0]["message"]["content"]
-            return {
-                "status": "success",
-                "prompt": prompt,
-                "response": content,
-                "model": data["model"],
-            }
+            result_body = orjson.dumps(
+                {
+                    "status": "success",
+                    "prompt": prompt,
+                    "response": content,
+                    "model": _OPENAI_MODEL,
+                }
+            )
+            _llm_response_cache[prompt] = (result_body, _llm_response_cache.timer())
+            return _llm_json_response(result_body, max_age=_LLM_CACHE_TTL)
         else:
-            return {
-                "status": "error",
-                "message": "No response from OpenAI API",
-                "prompt": prompt,
-            }
-
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode("utf-8") if e.fp else "No error details"
+            return ORJSONResponse(
+                {
+                    "status": "error",
+                    "message": "No response from OpenAI API",
+                    "prompt": prompt,
+                }
+            )
+
+    except httpx.HTTPStatusError as e:
+        error_body = e.response.text or "No error details"
+        raise HTTPException(
+            status_code=e.response.status_code,
+            detail=f"OpenAI API error: {e.response.reason_phrase}. "
+            f"Details: {error_body}",
+        )
+    except httpx.RequestError as e:
         raise HTTPException(
-            status_code=e.code,
-            detail=f"OpenAI API error: {e.reason}. Details: {error_body}",
+            status_code=500, detail=f"Network error: {type(e).__name__}: {e}"
         )
-    except urllib.error.URLError as e:
-        raise HTTPException(status_code=500, detail=f"Network error: {e.reason}")
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         raise HTTPException(status_code=500, detail=f"JSON decode error: {str(e)}")
     except HTTPException:
         raise
@@ -92,18 +137,39 @@ def call_openai_llm(prompt: str = "Hello") -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 
+def _llm_json_response(body: bytes, max_age: float) -> Response:
+    """
+    Wrap a pre-rendered /llm body in a JSON response.
+
+    Args:
+        body: The rendered JSON body
+        max_age: Seconds the body stays fresh; rounded down so downstream
+            caches never hold it past the server-side TTL
+
+    Returns:
+        JSON response with a matching Cache-Control header
+    """
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"Cache-Control": f"max-age={max(0, int(max_age))}"},
+    )
+
+
+@lru_cache(maxsize=1)
 def _get_openai_api_key() -> str:
     """
     Get OpenAI API key from environment variable.
 
+    The key is cached after the first successful lookup; call
+    ``_get_openai_api_key.cache_clear()`` to pick up a rotated key.
+
     Returns:
         The API key string
 
     Raises:
         HTTPException: If API key is not found
     """
-    import os
-
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise HTTPException(
@@ -115,4 +181,10 @@ def _get_openai_api_key() -> str:
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        http="httptools",
+        workers=os.cpu_count(),
+    )
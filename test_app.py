@@ -4,20 +4,36 @@ Unit tests for the FastAPI application.
 
 import json
 import unittest
-import urllib.error
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
+import httpx
+from cachetools import TTLCache
 from fastapi.testclient import TestClient
 
-from app import _get_openai_api_key, app
+from app import _get_openai_api_key, _llm_response_cache, app
+
+GREETING_REPLY = "Hello! How can I help you today?"
+GREETING_COMPLETION = {"choices": [{"message": {"content": GREETING_REPLY}}]}
 
 
 class TestApp(unittest.TestCase):
     """Test cases for the FastAPI application."""
 
+    @classmethod
+    def setUpClass(cls):
+        """Set up a test client shared by all tests."""
+        cls.client = TestClient(app)
+
     def setUp(self):
-        """Set up test client."""
-        self.client = TestClient(app)
+        """Reset module-level caches between tests."""
+        _get_openai_api_key.cache_clear()
+        _llm_response_cache.clear()
+
+    def _mock_openai(self, handler):
+        """Route outbound OpenAI calls through an in-process mock transport."""
+        if not hasattr(app.state, "http"):
+            self.addCleanup(delattr, app.state, "http")
+        app.state.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
 
     def test_hello_world(self):
         """Test the hello world endpoint."""
@@ -37,20 +53,11 @@ class TestApp(unittest.TestCase):
         self.assertEqual(data["service"], "eval-demo-api")
 
     @patch("os.getenv")
-    @patch("app.urllib.request.urlopen")
-    def test_llm_endpoint_success(self, mock_urlopen, mock_getenv):
+    def test_llm_endpoint_success(self, mock_getenv):
         """Test successful LLM API call."""
         mock_getenv.return_value = "test-api-key"
 
-        mock_response_data = {
-            "choices": [{"message": {"content": "Hello! How can I help you today?"}}]
-        }
-
-        mock_response = MagicMock()
-        mock_response.read.return_value = json.dumps(mock_response_data).encode("utf-8")
-        mock_response.__enter__.return_value = mock_response
-        mock_response.__exit__.return_value = None
-        mock_urlopen.return_value = mock_response
+        self._mock_openai(lambda request: httpx.Response(200, json=GREETING_COMPLETION))
 
         response = self.client.post("/llm?prompt=Hello")
         self.assertEqual(response.status_code, 200)
@@ -58,24 +65,108 @@ class TestApp(unittest.TestCase):
         data = response.json()
         self.assertEqual(data["status"], "success")
         self.assertEqual(data["prompt"], "Hello")
-        self.assertEqual(data["response"], "Hello! How can I help you today?")
+        self.assertEqual(data["response"], GREETING_REPLY)
         self.assertEqual(data["model"], "gpt-3.5-turbo")
 
     @patch("os.getenv")
-    @patch("app.urllib.request.urlopen")
-    def test_llm_endpoint_default_prompt(self, mock_urlopen, mock_getenv):
-        """Test LLM endpoint with default prompt."""
+    def test_llm_endpoint_request_body(self, mock_getenv):
+        """Test the OpenAI request body is valid JSON with the prompt escaped."""
+        mock_getenv.return_value = "test-api-key"
+        prompt = 'Say "hi"\n\\ café 👋'
+        captured = []
+
+        def handler(request):
+            captured.append(request)
+            return httpx.Response(200, json={"choices": []})
+
+        self._mock_openai(handler)
+
+        response = self.client.post("/llm", params={"prompt": prompt})
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(captured), 1)
+        self.assertEqual(captured[0].headers["Authorization"], "Bearer test-api-key")
+        self.assertEqual(
+            json.loads(captured[0].content),
+            {
+                "model": "gpt-3.5-turbo",
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": 150,
+                "temperature": 0.7,
+            },
+        )
+
+    @patch("os.getenv")
+    def test_llm_endpoint_caches_success_by_prompt(self, mock_getenv):
+        """Test repeated prompts are served from cache without calling OpenAI."""
+        mock_getenv.return_value = "test-api-key"
+        captured = []
+
+        def handler(request):
+            captured.append(request)
+            content = f"Reply {len(captured)}"
+            return httpx.Response(
+                200, json={"choices": [{"message": {"content": content}}]}
+            )
+
+        self._mock_openai(handler)
+
+        first = self.client.post("/llm?prompt=Hello")
+        second = self.client.post("/llm?prompt=Hello")
+        other = self.client.post("/llm?prompt=Bye")
+
+        self.assertEqual(len(captured), 2)
+        self.assertEqual(first.json()["response"], "Reply 1")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(other.json()["response"], "Reply 2")
+        self.assertEqual(first.headers["Cache-Control"], "max-age=60")
+
+    @patch("os.getenv")
+    def test_llm_endpoint_cache_hit_max_age_counts_down(self, mock_getenv):
+        """Test cache hits only advertise the TTL remaining on the cached body."""
         mock_getenv.return_value = "test-api-key"
+        now = [1000.0]
+        captured = []
+
+        def handler(request):
+            captured.append(request)
+            return httpx.Response(200, json=GREETING_COMPLETION)
+
+        self._mock_openai(handler)
+
+        cache = TTLCache(maxsize=1024, ttl=60, timer=lambda: now[0])
+        with patch("app._llm_response_cache", cache):
+            fresh = self.client.post("/llm?prompt=Hello")
+            now[0] += 45
+            late_hit = self.client.post("/llm?prompt=Hello")
+            now[0] += 14.5
+            last_hit = self.client.post("/llm?prompt=Hello")
+            now[0] += 1
+            refetched = self.client.post("/llm?prompt=Hello")
+
+        self.assertEqual(len(captured), 2)
+        self.assertEqual(late_hit.content, fresh.content)
+        self.assertEqual(fresh.headers["Cache-Control"], "max-age=60")
+        self.assertEqual(late_hit.headers["Cache-Control"], "max-age=15")
+        self.assertEqual(last_hit.headers["Cache-Control"], "max-age=0")
+        self.assertEqual(refetched.headers["Cache-Control"], "max-age=60")
+
+    @patch("os.getenv")
+    def test_llm_endpoint_does_not_cache_errors(self, mock_getenv):
+        """Test responses without choices are not cached."""
+        mock_getenv.return_value = "test-api-key"
+
+        self._mock_openai(lambda request: httpx.Response(200, json={"choices": []}))
 
-        mock_response_data = {
-            "choices": [{"message": {"content": "Hello! How can I help you today?"}}]
-        }
+        self.client.post("/llm?prompt=Hello")
+        self.assertNotIn("Hello", _llm_response_cache)
 
-        mock_response = MagicMock()
-        mock_response.read.return_value = json.dumps(mock_response_data).encode("utf-8")
-        mock_response.__enter__.return_value = mock_response
-        mock_response.__exit__.return_value = None
-        mock_urlopen.return_value = mock_response
+    @patch("os.getenv")
+    def test_llm_endpoint_default_prompt(self, mock_getenv):
+        """Test LLM endpoint with default prompt."""
+        mock_getenv.return_value = "test-api-key"
+
+        self._mock_openai(lambda request: httpx.Response(200, json=GREETING_COMPLETION))
 
         response = self.client.post("/llm")
         self.assertEqual(response.status_code, 200)
@@ -96,20 +187,12 @@ class TestApp(unittest.TestCase):
         self.assertIn("OPENAI_API_KEY environment variable not set", data["detail"])
 
     @patch("os.getenv")
-    @patch("app.urllib.request.urlopen")
-    def test_llm_endpoint_http_error(self, mock_urlopen, mock_getenv):
+    def test_llm_endpoint_http_error(self, mock_getenv):
         """Test LLM endpoint when OpenAI API returns HTTP error."""
         mock_getenv.return_value = "test-api-key"
 
-        import io
-
-        error_response = io.BytesIO(b'{"error": "Unauthorized"}')
-        mock_urlopen.side_effect = urllib.error.HTTPError(
-            "https://api.openai.com/v1/chat/completions",
-            401,
-            "Unauthorized",
-            None,
-            error_response,
+        self._mock_openai(
+            lambda request: httpx.Response(401, json={"error": "Unauthorized"})
         )
 
         response = self.client.post("/llm?prompt=Hello")
@@ -119,31 +202,38 @@ class TestApp(unittest.TestCase):
         self.assertIn("OpenAI API error", data["detail"])
 
     @patch("os.getenv")
-    @patch("app.urllib.request.urlopen")
-    def test_llm_endpoint_network_error(self, mock_urlopen, mock_getenv):
+    def test_llm_endpoint_network_error(self, mock_getenv):
         """Test LLM endpoint when network error occurs."""
         mock_getenv.return_value = "test-api-key"
 
-        error = urllib.error.URLError("Network unreachable")
-        mock_urlopen.side_effect = error
+        def raise_connect_error(request):
+            raise httpx.ConnectError("Network unreachable", request=request)
+
+        self._mock_openai(raise_connect_error)
 
         response = self.client.post("/llm?prompt=Hello")
         self.assertEqual(response.status_code, 500)
 
         data = response.json()
         self.assertIn("Network error", data["detail"])
+        self.assertIn("ConnectError", data["detail"])
+        self.assertIn("Network unreachable", data["detail"])
+
+        def raise_read_timeout(request):
+            raise httpx.ReadTimeout("", request=request)
+
+        self._mock_openai(raise_read_timeout)
+
+        response = self.client.post("/llm?prompt=Hello")
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()["detail"], "Network error: ReadTimeout: ")
 
     @patch("os.getenv")
-    @patch("app.urllib.request.urlopen")
-    def test_llm_endpoint_json_decode_error(self, mock_urlopen, mock_getenv):
+    def test_llm_endpoint_json_decode_error(self, mock_getenv):
         """Test LLM endpoint when JSON decode error occurs."""
         mock_getenv.return_value = "test-api-key"
 
-        mock_response = MagicMock()
-        mock_response.read.return_value = b"invalid json"
-        mock_response.__enter__.return_value = mock_response
-        mock_response.__exit__.return_value = None
-        mock_urlopen.return_value = mock_response
+        self._mock_openai(lambda request: httpx.Response(200, content=b"invalid json"))
 
         response = self.client.post("/llm?prompt=Hello")
         self.assertEqual(response.status_code, 500)
@@ -152,18 +242,13 @@ class TestApp(unittest.TestCase):
         self.assertIn("JSON decode error", data["detail"])
 
     @patch("os.getenv")
-    @patch("app.urllib.request.urlopen")
-    def test_llm_endpoint_no_choices_in_response(self, mock_urlopen, mock_getenv):
+    def test_llm_endpoint_no_choices_in_response(self, mock_getenv):
         """Test LLM endpoint when OpenAI response has no choices."""
         mock_getenv.return_value = "test-api-key"
 
         mock_response_data = {"usage": {"total_tokens": 10}}
 
-        mock_response = MagicMock()
-        mock_response.read.return_value = json.dumps(mock_response_data).encode("utf-8")
-        mock_response.__enter__.return_value = mock_response
-        mock_response.__exit__.return_value = None
-        mock_urlopen.return_value = mock_response
+        self._mock_openai(lambda request: httpx.Response(200, json=mock_response_data))
 
         response = self.client.post("/llm?prompt=Hello")
         self.assertEqual(response.status_code, 200)
@@ -173,6 +258,15 @@ class TestApp(unittest.TestCase):
         self.assertEqual(data["message"], "No response from OpenAI API")
         self.assertEqual(data["prompt"], "Hello")
 
+    def test_lifespan_manages_http_client(self):
+        """Test the shared HTTP client is opened on startup and closed on shutdown."""
+        with TestClient(app):
+            self.addCleanup(delattr, app.state, "http")
+            client = app.state.http
+            self.assertIsInstance(client, httpx.AsyncClient)
+            self.assertFalse(client.is_closed)
+        self.assertTrue(client.is_closed)
+
     @patch("os.getenv")
     def test_get_openai_api_key_success(self, mock_getenv):
         """Test successful API key retrieval."""
@@ -180,6 +274,14 @@ class TestApp(unittest.TestCase):
         api_key = _get_openai_api_key()
         self.assertEqual(api_key, "test-api-key")
 
+    @patch("os.getenv")
+    def test_get_openai_api_key_cached(self, mock_getenv):
+        """Test the API key is read from the environment only once."""
+        mock_getenv.return_value = "test-api-key"
+        _get_openai_api_key()
+        _get_openai_api_key()
+        mock_getenv.assert_called_once_with("OPENAI_API_KEY")
+
     @patch("os.getenv")
     def test_get_openai_api_key_missing(self, mock_getenv):
         """Test API key retrieval when key is missing."""